@@ -1,15 +1,22 @@
 from gpiozero import Button, DigitalOutputDevice
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import logging
 import platform
-import threading
 import time
 import pygame
 
+logger = logging.getLogger(__name__)
+
+# Checked once at import rather than on every HardwareInterface construction
+_IS_RPI = platform.system() == "Linux" and platform.node().lower().startswith("ras")
+
 class DotStarCustom:
 	"""
 	A custom DotStar LED strip controller using software SPI via gpiozero's DigitalOutputDevice.
 	"""
-	START_FRAME = [0x00] * 4  # 32 bits of zeros
-	DEFAULT_FRAME = [0xFF, 0x00, 0x00, 0x00]  # Default LED frame (brightness full, red color)
+	START_FRAME = bytes(4)  # 32 bits of zeros
+	DEFAULT_FRAME = bytes((0xFF, 0x00, 0x00, 0x00))  # Default LED frame (brightness full, LED off)
+	__slots__ = ('num_leds', 'brightness', '_header_byte', 'data_pin', 'clock_pin', '_frame', '_dirty')
 
 	def __init__(self, data_gpio, clock_gpio, num_leds, brightness=0.2):
 		"""
@@ -23,54 +30,51 @@ class DotStarCustom:
 			"""
 		self.num_leds = num_leds
 		self.brightness = max(0.0, min(brightness, 1.0))  # Clamp brightness between 0.0 and 1.0
+		self._header_byte = self._brightness_header(self.brightness)
 
 		# Initialize GPIO pins for Data and Clock
 		self.data_pin = DigitalOutputDevice(data_gpio, active_high=True, initial_value=False)
 		self.clock_pin = DigitalOutputDevice(clock_gpio, active_high=True, initial_value=False)
 		print(f"[INIT] Initialized Data pin GPIO{data_gpio} and Clock pin GPIO{clock_gpio}.")
 
-		# Initialize LED data
-		self.led_data = [self.DEFAULT_FRAME.copy() for _ in range(self.num_leds)]
+		# Packed wire frame: start frame followed by one [header, B, G, R] frame per LED
+		self._frame = bytearray(self.START_FRAME + self.DEFAULT_FRAME * self.num_leds)
+		self._dirty = True  # Set when _frame differs from what the strip was last sent
 		self.update()
 
-	def _send_bit(self, bit: int):
+	@staticmethod
+	def _brightness_header(brightness):
 		"""
-		Sends a single bit over SPI.
+		Builds the LED frame header byte for a brightness level.
 
 		Args:
-			bit (int): The bit to send (0 or 1).
-			"""
-		if bit:
-			self.data_pin.on()
-		else:
-			self.data_pin.off()
-		# Short delay to ensure the data pin is set before toggling the clock
-		time.sleep(0.0001)  # 100 microseconds
-		self.clock_pin.on()
-		time.sleep(0.0001)  # 100 microseconds
-		self.clock_pin.off()
-		time.sleep(0.0001)  # 100 microseconds
-
-	def _send_byte(self, byte: int):
-		"""
-		Sends a single byte over SPI, MSB first.
+			brightness (float): Brightness level (0.0 to 1.0).
 
-		Args:
-			byte (int): The byte to send.
+		Returns:
+			int: 0xE0 followed by the 5-bit brightness (0-31).
 			"""
-		for i in range(7, -1, -1):
-			bit = (byte >> i) & 0x01
-			self._send_bit(bit)
+		return 0xE0 | (int(brightness * 31) & 0x1F)
 
-	def _send_frame(self, frame: list):
+	def _write_bytes(self, data):
 		"""
-		Sends a frame (list of bytes) to the DotStar strip.
+		Sends bytes over software SPI, MSB first.
 
 		Args:
-			frame (list): List of integers representing bytes.
+			data (bytes): The bytes to send.
 			"""
-		for byte in frame:
-			self._send_byte(byte)
+		# Bind the pin methods locally so the per-bit loop avoids attribute lookups
+		data_on, data_off = self.data_pin.on, self.data_pin.off
+		clock_on, clock_off = self.clock_pin.on, self.clock_pin.off
+		for byte in data:
+			for shift in (7, 6, 5, 4, 3, 2, 1, 0):
+				if (byte >> shift) & 0x01:
+					data_on()
+				else:
+					data_off()
+				# DotStar latches on the clock edge with no minimum period; interpreter overhead
+				# between calls already exceeds the chip's setup/hold times, so no delay is needed
+				clock_on()
+				clock_off()
 
 	def set_pixel(self, index, color):
 		"""
@@ -81,35 +85,76 @@ class DotStarCustom:
 			color (tuple): (R, G, B) tuple with values from 0 to 255.
 			"""
 		if 0 <= index < self.num_leds:
-			brightness_byte = int(self.brightness * 31) & 0x1F  # 5-bit brightness (0-31)
 			r, g, b = color
-			self.led_data[index] = [0xE0 | brightness_byte, b, g, r]
-			print(f"[DEBUG] LED {index} set to color {color} with brightness {self.brightness}.")
+			offset = len(self.START_FRAME) + 4 * index
+			pixel = bytes((self._header_byte, b, g, r))
+			if self._frame[offset:offset + 4] == pixel:
+				return
+			self._frame[offset:offset + 4] = pixel
+			self._dirty = True
+			logger.debug("LED %d set to color %s with brightness %s.", index, color, self.brightness)
 		else:
 			print(f"[WARNING] LED index {index} is out of range.")
 
-	def show(self):
+	def set_brightness(self, brightness):
 		"""
-		Sends the LED data to the DotStar strip using software SPI.
+		Sets the brightness of every LED. Takes effect on the next update.
+
+		Args:
+			brightness (float): Brightness level (0.0 to 1.0).
+			"""
+		self.brightness = max(0.0, min(brightness, 1.0))
+		self._header_byte = self._brightness_header(self.brightness)
+		self._frame[len(self.START_FRAME)::4] = bytes((self._header_byte,)) * self.num_leds
+		self._dirty = True
+
+	def make_frame(self, index, color):
 		"""
-		# Start frame
-		self._send_frame(self.START_FRAME)
+		Builds a complete wire frame with one LED set to a color and the rest off, for use with write_frame.
+		The frame captures the current brightness; rebuild it after set_brightness.
+
+		Args:
+			index (int): LED index.
+			color (tuple): (R, G, B) tuple with values from 0 to 255.
 
-		# LED frames
-		for frame in self.led_data:
-			self._send_frame(frame)
+		Returns:
+			bytes: The packed frame, including the start frame.
+			"""
+		if not 0 <= index < self.num_leds:
+			raise IndexError(f"LED index {index} is out of range.")
+		frame = bytearray(self.START_FRAME + bytes((self._header_byte, 0, 0, 0)) * self.num_leds)
+		r, g, b = color
+		offset = len(self.START_FRAME) + 4 * index
+		frame[offset:offset + 4] = bytes((self._header_byte, b, g, r))
+		return bytes(frame)
 
-		# Optional end frame (not strictly necessary for short strips)
-		# Uncomment the following line if needed for longer strips
-		# self._send_frame([0x00] * 4)
+	def write_frame(self, frame):
+		"""
+		Replaces the LED data with a precomputed frame and sends it to the strip.
 
-		print("[DEBUG] Sent data to DotStar strip.")
+		Args:
+			frame (bytes): A frame built by make_frame.
+			"""
+		if not self._dirty and self._frame == frame:
+			return
+		self._frame[:] = frame
+		self._dirty = True
+		self.show()
+
+	def show(self):
+		"""
+		Sends the LED data to the DotStar strip.
+		"""
+		# An end frame is not strictly necessary for short strips; append bytes(4) to the frame if needed for longer strips.
+		self._write_bytes(self._frame)
+		self._dirty = False
 
 	def update(self):
 		"""
-		Refreshes the LED strip with the current LED data.
+		Refreshes the LED strip with the current LED data, skipping the write if nothing changed.
 		"""
-		self.show()
+		if self._dirty:
+			self.show()
 
 	def deinit(self):
 		"""
@@ -125,6 +170,9 @@ class HardwareInterface:
 	DOTSTAR_CLOCK_GPIO = 6  # GPIO6 for DotStar Clock
 	NUM_LEDS = 3          # Number of LEDs in the strip
 	BRIGHTNESS = 0.2      # Set brightness (0.0 to 1.0)
+	WAKE_SOUND_PATH = "audio/wake_sound.wav"
+	PRESS_COALESCE_NS = 500_000_000  # Ignore presses within 0.5s of the last accepted one
+	__slots__ = ('speech_handler', '_executor', '_session', '_last_press_ns', 'button', 'dots', '_frame_listening', '_frame_off', '_wake_sound')
 
 	def __init__(self, speech_handler):
 		"""
@@ -135,10 +183,14 @@ class HardwareInterface:
 			"""
 		self.speech_handler = speech_handler
 
+		# Single worker that owns the wake sound and LED and waits out each speech session,
+		# so presses are handled one at a time instead of spawning a thread per press
+		self._executor = ThreadPoolExecutor(max_workers=1)
+		self._session = None  # Future of the press currently being handled
+		self._last_press_ns = 0
+
 		# Check if the script is running on a Raspberry Pi
-		platform_info = platform.uname()
-		print("[INIT] Platform Info:", platform_info)
-		if platform_info.system != "Linux" or not platform_info.node.lower().startswith("ras"):
+		if not _IS_RPI:
 			raise EnvironmentError("This script is intended to run on a Raspberry Pi.")
 
 		# Initialize Button using gpiozero
@@ -153,35 +205,55 @@ class HardwareInterface:
 			num_leds=self.NUM_LEDS,
 			brightness=self.BRIGHTNESS
 		)
-		print("[INIT] DotStar LED strip initialized with software SPI.")
+		print("[INIT] DotStar LED strip initialized.")
+		# Precompute the two states the strip switches between
+		self._frame_listening = self.dots.make_frame(0, (0, 0, 255))  # First LED blue (RGB: 0, 0, 255)
+		self._frame_off = self.dots.make_frame(0, (0, 0, 0))  # First LED off
+
+		# Open the mixer and decode the wake sound once so a press only has to start playback
+		pygame.mixer.init(frequency=44100, buffer=512)  # Matches the wake sound's sample rate
+		self._wake_sound = pygame.mixer.Sound(self.WAKE_SOUND_PATH)
+		print("[INIT] Wake sound loaded.")
 
 	def handle_press_event(self):
 		"""
-		Handles button press events and invokes the SpeechHandler.
+		Handles button press events on the gpiozero callback thread by handing them to the worker.
+		Presses made while a session is in progress are ignored rather than queued.
+		"""
+		if self._session is not None and not self._session.done():
+			return
+		# Monotonic integer clock: immune to wall-clock adjustments and no float math
+		now = time.monotonic_ns()
+		if now - self._last_press_ns < self.PRESS_COALESCE_NS:
+			return
+		self._last_press_ns = now
+		self._session = self._executor.submit(self._process_press)
+
+	def _process_press(self):
+		"""
+		Signals that the device is listening, invokes the SpeechHandler and waits for it to finish.
+		Runs on the worker thread, so the next press is only handled once this session is over.
 		"""
 		print("[DEBUG] Button press event detected.")
 		# Play a pleasant beep sound to tell the user the device is listening
 		self.play_wake_sound()
 		# Activate the DotStar LED
-		self.dots.set_pixel(0, (0, 0, 255))  # Set the first LED to blue (RGB: 0, 0, 255)
-		self.dots.update()
-		# Invoke speech handling in a separate thread to prevent blocking
-		threading.Thread(target=self.speech_handler.handle_speech, args=(self.handle_speech_complete,), daemon=True).start()
+		self.dots.write_frame(self._frame_listening)
+		try:
+			self.speech_handler.handle_speech().result()
+		except CancelledError:
+			print("[DEBUG] Speech handling cancelled.")
+		except Exception as e:
+			print(f"[ERROR] Speech handling failed: {e}")
+		finally:
+			# This worker owns the LED, so it is turned off however the session ended
+			self.handle_speech_complete()
 
 	def play_wake_sound(self):
 		"""
-		Plays a pleasant beep sound using Pygame in a separate thread.
-		"""
-		threading.Thread(target=self._play_sound, daemon=True).start()  # Start the sound in a new thread
-
-	def _play_sound(self):
-		"""
-		Helper method to play the sound.
+		Plays a pleasant beep sound. Non-blocking, as pygame mixes on its own thread.
 		"""
-		pygame.mixer.init()  # Initialize the mixer
-		beep_sound = pygame.mixer.Sound("audio/wake_sound.wav")  # Load your beep sound file
-		beep_sound.play()  # Play the sound
-		pygame.time.delay(500)  # Wait for the sound to finish playing (adjust as needed)
+		self._wake_sound.play()
 
 	def handle_speech_complete(self):
 		"""
@@ -189,13 +261,15 @@ class HardwareInterface:
 		"""
 		print("[DEBUG] Speech handling complete.")
 		# Turn off the DotStar LED
-		self.dots.set_pixel(0, (0, 0, 0))  # Set the first LED to off (RGB: 0, 0, 0)
-		self.dots.update()
+		self.dots.write_frame(self._frame_off)
 
 	def cleanup(self):
 		"""
-		Cleans up the GPIO settings.
+		Cleans up the GPIO settings. Call after the SpeechHandler is closed, so the press in progress
+		is cancelled and the worker can finish with the LED before the strip is released.
 		"""
 		self.button.close()
+		self._executor.shutdown(wait=True, cancel_futures=True)
 		self.dots.deinit()
+		pygame.mixer.quit()
 		print("[CLEANUP] GPIO settings cleaned up.")
\ No newline at end of file
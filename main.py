@@ -2,7 +2,7 @@ from speech import SpeechHandler
 from hardware import HardwareInterface
 # from web_interface import start_web_interface  # Uncomment if using web interface
 
-import time
+from signal import pause
 
 def main():
     """
@@ -21,12 +21,13 @@ def main():
     print("[MAIN] Application is running. Press Ctrl+C to exit.")
 
     try:
-        # Keep the main thread alive to listen for events
-        while True:
-            time.sleep(1)
+        # Keep the main thread alive to listen for events; sleeps until a signal arrives
+        pause()
     except KeyboardInterrupt:
         print("\n[MAIN] Exiting gracefully.")
     finally:
+        # Close speech first so the press in progress is cancelled and can turn the LED off
+        speech_handler.close()
         hardware_interface.cleanup()
         # If you started the web interface thread, ensure it's properly terminated
         # web_thread.join()
@@ -1,13 +1,17 @@
 import openai
 import os
+import re
 import asyncio
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 import websockets
 import json
 from functions import get_current_weather, control_lights, control_spotify
-import time
 
 system_prompt = "You are an intelligent assistant that helps control smart home devices."
 model = "gpt-4o-realtime-preview-2024-10-01"
+# Single pass over the response finds the first known command keyword
+intent_pattern = re.compile(r"\b(weather|lights|spotify)\b", re.IGNORECASE)
 
 class SpeechHandler:
 	def __init__(self):
@@ -17,22 +21,109 @@ class SpeechHandler:
 		openai.api_key = os.getenv("OPENAI_API_KEY")
 		# Initialize other necessary components here
 
+		# One event loop for the handler's lifetime, on its own thread, with a single long-lived
+		# task draining queued speech requests and one worker for blocking tool calls
+		self._loop = asyncio.new_event_loop()
+		self._tool_pool = ThreadPoolExecutor(max_workers=1)
+		# Guards _closing so no request can be scheduled onto the loop once close() has started
+		self._close_lock = threading.Lock()
+		self._closing = False
+		self._loop_ready = threading.Event()
+		self._loop_thread = threading.Thread(target=self._run_loop, daemon=True)
+		self._loop_thread.start()
+		self._loop_ready.wait()
+
+		self._intent_handlers = {
+			"weather": self._handle_weather,
+			"lights": self._handle_lights,
+			"spotify": self._handle_spotify,
+		}
+
+	def _run_loop(self):
+		"""
+		Runs the speech event loop. Executes on the handler's loop thread.
+		"""
+		asyncio.set_event_loop(self._loop)
+		# Created here so the queue is bound to this loop rather than the constructing thread's
+		self._jobs = asyncio.Queue()
+		self._loop.create_task(self._speech_loop())
+		self._loop_ready.set()
+		self._loop.run_forever()
+		# Requests queued after the speech loop was cancelled are never picked up; release their callers
+		while not self._jobs.empty():
+			_, done = self._jobs.get_nowait()
+			done.cancel()
+
+	async def _speech_loop(self):
+		"""
+		Processes queued speech requests one at a time, resolving each request's future when it finishes.
+		"""
+		while True:
+			speech_complete_callback, done = await self._jobs.get()
+			if not done.set_running_or_notify_cancel():
+				continue
+			try:
+				await self.process_speech(speech_complete_callback)
+			except asyncio.CancelledError:
+				done.set_exception(CancelledError())
+				raise
+			except Exception as e:
+				done.set_exception(e)
+			else:
+				done.set_result(None)
+
 	def handle_speech(self, speech_complete_callback=None):
 		"""
-		Handles the speech processing tasks.
+		Queues a speech processing request. Safe to call from any thread; returns immediately.
+
+		Returns:
+			concurrent.futures.Future: Resolves when the request has been fully handled, carries the
+			exception if it failed, or is cancelled if the handler is closed first.
 		"""
-		# Run the asynchronous speech handling in an event loop
-		loop = asyncio.new_event_loop()
-		asyncio.set_event_loop(loop)
-		loop.run_until_complete(self.process_speech(speech_complete_callback))
-		loop.close()
+		done = Future()
+		with self._close_lock:
+			if self._closing:
+				done.cancel()
+			else:
+				self._loop.call_soon_threadsafe(self._jobs.put_nowait, (speech_complete_callback, done))
+		return done
 
-	async def process_speech(self, speech_complete_callback):
-		# Capture audio input
-		audio_input = self.capture_audio()
+	async def _cancel_pending(self):
+		"""
+		Cancels the speech loop's tasks, including the session in progress.
+		"""
+		tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
 
-		# Convert audio input to text using OpenAI Whisper
-		user_message = await self.transcribe_audio(audio_input)
+	def close(self):
+		"""
+		Cancels pending speech work, then stops and closes the speech loop and the tool worker.
+		Requests made during or after close() are cancelled rather than queued.
+		"""
+		with self._close_lock:
+			self._closing = True
+		asyncio.run_coroutine_threadsafe(self._cancel_pending(), self._loop).result()
+		self._loop.call_soon_threadsafe(self._loop.stop)
+		self._loop_thread.join()
+		self._loop.close()
+		self._tool_pool.shutdown(wait=False)
+
+	async def process_speech(self, speech_complete_callback):
+		# Capture audio input and convert it to text using OpenAI Whisper as a pipeline:
+		# each captured chunk is transcribed while the next one is being recorded
+		audio_chunks = asyncio.Queue(maxsize=4)
+		stages = [
+			asyncio.create_task(self.capture_audio(audio_chunks)),
+			asyncio.create_task(self.transcribe_audio(audio_chunks)),
+		]
+		try:
+			_, user_message = await asyncio.gather(*stages)
+		finally:
+			# Don't leave the other stage blocked on the queue if one of them failed
+			for stage in stages:
+				stage.cancel()
 
 		# Send and receive messages via OpenAI's Realtime API over WebSockets
 		response = await self.chat_with_openai(user_message)
@@ -41,25 +132,28 @@ class SpeechHandler:
 		await self.process_response(response)
 
 		# Provide audio feedback
-		self.play_audio(response, speech_complete_callback)
+		await self.play_audio(response, speech_complete_callback)
 
-	def capture_audio(self):
+	async def capture_audio(self, audio_chunks):
 		"""
-		Captures audio input from the user.
+		Captures audio input from the user, putting each chunk on audio_chunks and None when done.
 		Implement this method based on your hardware specifications.
 		"""
 		# Placeholder implementation
 		print("[SPEECH] Capturing audio...")
-		time.sleep(2)  # Simulate audio capture delay
-		return "Simulated audio data"
+		for i in range(4):
+			await asyncio.sleep(0.5)  # Simulate capturing half a second of audio
+			await audio_chunks.put(f"Simulated audio chunk {i}")
+		await audio_chunks.put(None)
 
-	async def transcribe_audio(self, audio_data):
+	async def transcribe_audio(self, audio_chunks):
 		"""
-		Transcribes audio data to text using OpenAI Whisper.
+		Transcribes audio chunks from audio_chunks to text using OpenAI Whisper as they arrive.
 		Implement this method based on your requirements.
 		"""
 		print("[SPEECH] Transcribing audio...")
-		await asyncio.sleep(1)  # Simulate transcription delay
+		while await audio_chunks.get() is not None:
+			await asyncio.sleep(0.25)  # Simulate transcription delay per chunk
 		return "Simulated transcribed text"
 
 	async def chat_with_openai(self, message):
@@ -76,28 +170,42 @@ class SpeechHandler:
 		Processes the response from OpenAI and triggers appropriate functions.
 		"""
 		print(f"[SPEECH] Processing response: {response}")
-		response_lower = response.lower()
-		if "weather" in response_lower:
-			weather_info = await asyncio.to_thread(get_current_weather)
-			self.play_audio(weather_info)
-		elif "lights" in response_lower:
-			await asyncio.to_thread(control_lights)
-			self.play_audio("I have adjusted the lights for you.")
-		elif "spotify" in response_lower:
-			await asyncio.to_thread(control_spotify)
-			self.play_audio("Playing your favorite Spotify playlist.")
+		match = intent_pattern.search(response)
+		if match:
+			await self._intent_handlers[match.group(1).lower()]()
 		else:
 			# If no known command is found, just repeat the response
-			self.play_audio(response)
+			await self.play_audio(response)
+
+	async def _handle_weather(self):
+		"""
+		Fetches the current weather and reads it back.
+		"""
+		weather_info = await self._loop.run_in_executor(self._tool_pool, get_current_weather)
+		await self.play_audio(weather_info)
+
+	async def _handle_lights(self):
+		"""
+		Adjusts the lights and confirms.
+		"""
+		await self._loop.run_in_executor(self._tool_pool, control_lights)
+		await self.play_audio("I have adjusted the lights for you.")
+
+	async def _handle_spotify(self):
+		"""
+		Starts Spotify playback and confirms.
+		"""
+		await self._loop.run_in_executor(self._tool_pool, control_spotify)
+		await self.play_audio("Playing your favorite Spotify playlist.")
 
-	def play_audio(self, message, complete_callback=None):
+	async def play_audio(self, message, complete_callback=None):
 		"""
 		Plays audio feedback to the user.
 		Implement this method based on your hardware specifications.
 		"""
 		print(f"[SPEECH] Playing audio: {message}")
-		# Simulate audio playback delay
-		time.sleep(2)  # Simulate the time taken to play audio
+		# Simulate audio playback delay without blocking the speech loop
+		await asyncio.sleep(2)  # Simulate the time taken to play audio
 		if complete_callback:
 			complete_callback()  # Call the callback to indicate playback is complete
 		
\ No newline at end of file